@@ -1,6 +1,7 @@
 import streamlit as st
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import time
+from analysis import (REPETITION_THRESHOLD, NEGATIVE_SENTIMENT_THRESHOLD, analyze_sentiment,
+                      classify_emotion, count_repetitions)
 import streamlit as st
 
 
@@ -72,35 +73,19 @@ st.set_page_config(
 transcript = "I... I don't want to go. I don't want to. Please. Please. It's too loud. It's too loud. I don't like it. I want to go home. I want mom. I want mom."
 
 # Analyze sentiment
-analyzer = SentimentIntensityAnalyzer()
-sentiment_score = analyzer.polarity_scores(transcript)
+sentiment_score = analyze_sentiment(transcript)
 
 # Detect word repetition
-words = transcript.lower().replace('.', '').split()
-repetition_count = sum([1 for i in range(1, len(words)) if words[i] == words[i-1]])
+repetition_count = count_repetitions(transcript)
 
 # Simulated flags for demonstration
 high_bpm = True
 high_volume = True
-repetition_alert = repetition_count >= 2
-negative_sentiment = sentiment_score['compound'] < -0.3
+repetition_alert = repetition_count >= REPETITION_THRESHOLD
+negative_sentiment = sentiment_score['compound'] < NEGATIVE_SENTIMENT_THRESHOLD
 
 # Determine emoji and label based on emotion state
-
-# Display "Feeling" with styling
-
-if high_bpm and high_volume and repetition_alert and negative_sentiment:
-    emotion = "Anxious"
-    emoji = "😰"
-elif negative_sentiment:
-    emotion = "Sad"
-    emoji = "😢"
-elif sentiment_score['compound'] > 0.3:
-    emotion = "Happy"
-    emoji = "😊"
-else:
-    emotion = "Neutral"
-    emoji = "😐"
+emotion, emoji = classify_emotion(high_bpm, high_volume, repetition_alert, sentiment_score['compound'])
 
 # Main title
 st.title("🧠 NeuroPath")
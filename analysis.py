@@ -0,0 +1,166 @@
+"""Emotion-signal analysis shared by the Streamlit pages and the batch CLI.
+
+Nothing in here touches Streamlit, so sessions can be re-scored headlessly
+(see batch_analyze.py) with exactly the same logic the dashboard uses.
+"""
+import re
+from collections import Counter
+import numpy as np
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from bpm_detector import BpmAnomalyDetector
+
+HIGH_BPM_THRESHOLD = 100
+HIGH_VOLUME_THRESHOLD = 0.4
+REPETITION_THRESHOLD = 2
+NEGATIVE_SENTIMENT_THRESHOLD = -0.3
+POSITIVE_SENTIMENT_THRESHOLD = 0.3
+
+_analyzer = None
+
+
+def analyze_sentiment(transcript):
+    """Return VADER polarity scores for a transcript."""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer.polarity_scores(transcript)
+
+
+def count_repetitions(transcript):
+    """Count words immediately repeated in a transcript."""
+    words = transcript.lower().replace('.', '').split()
+    return sum([1 for i in range(1, len(words)) if words[i] == words[i-1]])
+
+
+def top_terms(transcript, n=10):
+    """Return the ``n`` most frequent words in a transcript."""
+    words = re.findall(r'\w+', transcript.lower())
+    return Counter(words).most_common(n)
+
+
+def has_high_bpm(timestamps, bpms):
+    """True if the heart rate was high in absolute terms over a recorded series.
+
+    See ``detector_has_high_bpm``.
+    """
+    detector = BpmAnomalyDetector()
+    alerts = detector.update_many("default", zip(timestamps, bpms))
+    return detector_has_high_bpm(detector, "default", alerts)
+
+
+def detector_has_high_bpm(detector, subject_id, alerts):
+    """True if a subject's heart rate is high, given the detector that scored it.
+
+    Either the adaptive baseline sits above ``HIGH_BPM_THRESHOLD``, or one of
+    ``alerts`` is an upward spike or sustained rise that reached it. A change
+    that stays within the normal range (say 60 to 75) doesn't count.
+    """
+    baseline = detector.baseline(subject_id)
+    if baseline is not None and baseline[0] > HIGH_BPM_THRESHOLD:
+        return True
+    return any(
+        alert.bpm > HIGH_BPM_THRESHOLD and (alert.kind == "rise" or (alert.kind == "spike" and alert.score > 0))
+        for alert in alerts
+    )
+
+
+def load_audio(path):
+    """Load an audio file as ``(samples, sample_rate)``."""
+    # librosa is slow to import, so only pay for it when audio is analyzed
+    import librosa
+    return librosa.load(path)
+
+
+def pitch_track(y, sr_rate):
+    """Return librosa's ``(pitches, magnitudes)`` pitch track."""
+    import librosa
+    return librosa.piptrack(y=y, sr=sr_rate)
+
+
+def average_pitch(pitches, magnitudes):
+    """Average pitch (Hz) over the bins louder than the median magnitude."""
+    pitch_values = pitches[magnitudes > np.median(magnitudes)]
+    return np.mean(pitch_values) if len(pitch_values) > 0 else 0
+
+
+def volume_series(y, sr_rate, frame_seconds=0.1):
+    """Mean absolute amplitude per frame and the frame start times in seconds."""
+    frame_size = int(sr_rate * frame_seconds)
+    volume_data = np.array([
+        np.mean(np.abs(y[i:i + frame_size]))
+        for i in range(0, len(y), frame_size)
+    ])
+    volume_timestamps = [round(i * frame_seconds, 2) for i in range(len(volume_data))]
+    return volume_data, volume_timestamps
+
+
+def classify_emotion(high_bpm, high_volume, repetition_alert, sentiment_compound):
+    """Map the emotion indicators to an ``(emotion, emoji)`` pair."""
+    negative_sentiment = sentiment_compound < NEGATIVE_SENTIMENT_THRESHOLD
+    if high_bpm and high_volume and repetition_alert and negative_sentiment:
+        return "Anxious", "😰"
+    elif negative_sentiment:
+        return "Sad", "😢"
+    elif sentiment_compound > POSITIVE_SENTIMENT_THRESHOLD:
+        return "Happy", "😊"
+    else:
+        return "Neutral", "😐"
+
+
+RADAR_LABELS = ['Max BPM', 'Avg Volume', 'Repetition Alert', 'Negative Sentiment']
+
+
+def radar_timeline(bpm_times, bpms, volumes, sentiment_compound, repetition_alert,
+                   window_seconds=60, max_windows=240, volume_times=None):
+    """Compute the emotion-radar indicators for every time window in one pass.
+
+    ``bpm_times`` is a datetime64 array that defines the windows; windows
+    without BPM samples are skipped. When ``volume_times`` is given, volume
+    is bucketed into the same windows (windows with no volume score 0);
+    otherwise the volume series is assumed to span the session and is split
+    into equal slices, one per window. The transcript has no timing, so
+    repetition and sentiment are the same in every window. The window is
+    widened when the session would need more than ``max_windows`` of them.
+
+    Returns ``(window_starts, values)`` with ``values`` of shape
+    ``(n_windows, 4)`` in ``RADAR_LABELS`` order, each scaled to 0-1.
+    """
+    times = np.asarray(bpm_times, dtype="datetime64[ns]")
+    bpms = np.asarray(bpms, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+
+    span = (times[-1] - times[0]) / np.timedelta64(1, "s")
+    window_seconds = max(window_seconds, span / max_windows)
+    window = np.timedelta64(int(window_seconds * 1e9), "ns")
+    n_edges = min(int(span // window_seconds) + 1, max_windows)
+    edges = times[0] + window * np.arange(n_edges)
+    starts = np.searchsorted(times, edges)
+    nonempty = np.diff(np.r_[starts, len(times)]) > 0  # skip windows without samples
+    starts, window_starts = starts[nonempty], edges[nonempty]
+    n = len(starts)
+
+    max_bpm = np.maximum.reduceat(bpms, starts)
+
+    if volume_times is not None:
+        volume_times = np.asarray(volume_times, dtype="datetime64[ns]")
+        # The last window runs to the end so nothing past its edge is lost
+        window_ends = np.r_[edges[1:], np.datetime64("NaT")][nonempty]
+        volume_starts = np.searchsorted(volume_times, window_starts)
+        volume_ends = np.where(np.isnat(window_ends), len(volume_times),
+                               np.searchsorted(volume_times, window_ends))
+        sums = np.r_[0.0, np.cumsum(volumes)]
+        volume_counts = volume_ends - volume_starts
+        avg_volume = np.where(volume_counts > 0,
+                              (sums[volume_ends] - sums[volume_starts]) / np.maximum(volume_counts, 1), 0.0)
+    else:
+        # Equal volume slices; a slice shorter than one sample reuses the nearest one
+        volume_starts = np.minimum((np.arange(n) * len(volumes)) // n, len(volumes) - 1)
+        volume_counts = np.diff(np.r_[volume_starts, len(volumes)])
+        avg_volume = np.add.reduceat(volumes, volume_starts) / np.maximum(volume_counts, 1)
+
+    values = np.empty((n, 4))
+    values[:, 0] = np.minimum(max_bpm / 150, 1)  # assuming 150 BPM max for scale
+    values[:, 1] = np.minimum(avg_volume, 1)  # volume already 0-1 scale
+    values[:, 2] = 1 if repetition_alert else 0
+    values[:, 3] = abs(sentiment_compound) if sentiment_compound < 0 else 0
+    return window_starts, values
@@ -0,0 +1,234 @@
+"""Re-score archived sessions headlessly, in parallel.
+
+Each session is a sub-directory of the archive holding any of:
+
+    transcript.txt      speech transcript
+    heartBeat.csv       ``timestamp,bpm`` samples
+    audio_volume.csv    ``time_step,volume`` samples
+    *.wav               recording (used for pitch, and for volume when
+                        there is no audio_volume.csv)
+
+Sessions are fanned out over a process pool and each result row is written
+as soon as it arrives, to CSV or to a directory of Parquet part files. Rerun
+the same command after an interruption and sessions already scored
+successfully are skipped; sessions that failed are retried, and the newest
+row for a session is the one that counts.
+
+    python batch_analyze.py archive/ results.csv --workers 8
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+from multiprocessing import Pool
+import pandas as pd
+from analysis import (HIGH_VOLUME_THRESHOLD, REPETITION_THRESHOLD, NEGATIVE_SENTIMENT_THRESHOLD,
+                      analyze_sentiment, average_pitch, classify_emotion, count_repetitions,
+                      has_high_bpm, load_audio, pitch_track, volume_series)
+
+FIELDS = [
+    "session_id", "sentiment_compound", "sentiment_neg", "sentiment_neu", "sentiment_pos",
+    "repetition_count", "max_bpm", "avg_bpm", "high_bpm", "avg_volume", "high_volume",
+    "avg_pitch", "repetition_alert", "negative_sentiment", "emotion", "error",
+]
+
+
+def analyze_session(session_dir):
+    """Score one session directory, returning a result row."""
+    row = dict.fromkeys(FIELDS)
+    row["session_id"] = os.path.basename(os.path.normpath(session_dir))
+    try:
+        transcript_path = os.path.join(session_dir, "transcript.txt")
+        transcript = ""
+        if os.path.exists(transcript_path):
+            with open(transcript_path, encoding="utf-8") as f:
+                transcript = f.read()
+        sentiment_score = analyze_sentiment(transcript)
+        repetition_count = count_repetitions(transcript)
+        row.update(
+            sentiment_compound=sentiment_score["compound"],
+            sentiment_neg=sentiment_score["neg"],
+            sentiment_neu=sentiment_score["neu"],
+            sentiment_pos=sentiment_score["pos"],
+            repetition_count=repetition_count,
+        )
+
+        high_bpm = False
+        heartbeat_path = os.path.join(session_dir, "heartBeat.csv")
+        if os.path.exists(heartbeat_path):
+            heartbeat_df = pd.read_csv(heartbeat_path)
+            high_bpm = has_high_bpm(heartbeat_df["timestamp"], heartbeat_df["bpm"])
+            row.update(max_bpm=heartbeat_df["bpm"].max(), avg_bpm=heartbeat_df["bpm"].mean())
+
+        avg_volume = None
+        volume_path = os.path.join(session_dir, "audio_volume.csv")
+        if os.path.exists(volume_path):
+            avg_volume = pd.read_csv(volume_path)["volume"].mean()
+        wav_paths = sorted(glob.glob(os.path.join(session_dir, "*.wav")))
+        if wav_paths:
+            y, sr_rate = load_audio(wav_paths[0])
+            row["avg_pitch"] = float(average_pitch(*pitch_track(y, sr_rate)))
+            if avg_volume is None:
+                avg_volume = float(volume_series(y, sr_rate)[0].mean())
+
+        high_volume = avg_volume is not None and avg_volume > HIGH_VOLUME_THRESHOLD
+        repetition_alert = repetition_count >= REPETITION_THRESHOLD
+        row.update(
+            high_bpm=high_bpm,
+            avg_volume=avg_volume,
+            high_volume=high_volume,
+            repetition_alert=repetition_alert,
+            negative_sentiment=sentiment_score["compound"] < NEGATIVE_SENTIMENT_THRESHOLD,
+            emotion=classify_emotion(high_bpm, high_volume, repetition_alert, sentiment_score["compound"])[0],
+        )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+class CsvSink:
+    """Append result rows to a CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _drop_partial_row(self):
+        # A run killed mid-write can leave a row without its newline; drop it
+        # so the session is rescored and the next row doesn't get glued onto it
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                tail = f.read(step)
+                cut = tail.rfind(b"\n")
+                if pos == end and cut == step - 1:
+                    return
+                if cut >= 0:
+                    f.truncate(pos - step + cut + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+
+    def done_sessions(self):
+        if not os.path.exists(self.path):
+            return set()
+        self._drop_partial_row()
+        if os.path.getsize(self.path) == 0:
+            return set()
+        df = pd.read_csv(self.path, usecols=["session_id", "error"], dtype=str)
+        return set(df.loc[df["error"].isna(), "session_id"])
+
+    def __enter__(self):
+        if os.path.exists(self.path):
+            self._drop_partial_row()
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if new_file:
+            self._writer.writeheader()
+        return self
+
+    def write(self, row):
+        self._writer.writerow(row)
+        # Flush per row so an interrupted run loses nothing already scored
+        self._file.flush()
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class ParquetSink:
+    """Write result rows to a directory of Parquet part files.
+
+    Buffered rows go to a new part every ``rows_per_part`` rows, or on the
+    first row after ``flush_interval`` seconds, so an interrupted run loses
+    little. Parts are written under a temporary name and renamed into place,
+    so a killed run never leaves a truncated part behind.
+    """
+
+    def __init__(self, path, rows_per_part=50, flush_interval=10.0):
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._last_flush = time.monotonic()
+
+    def done_sessions(self):
+        parts = glob.glob(os.path.join(self.path, "*.parquet"))
+        if not parts:
+            return set()
+        df = pd.concat(pd.read_parquet(p, columns=["session_id", "error"]) for p in parts)
+        return set(df.loc[df["error"].isna(), "session_id"])
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        # Leftovers of a run killed mid-write; their rows were never committed
+        for stale in glob.glob(os.path.join(self.path, "*.parquet.tmp")):
+            os.remove(stale)
+        self._last_flush = time.monotonic()
+        return self
+
+    def _flush(self):
+        if self._rows:
+            part = os.path.join(self.path, f"part-{time.time_ns()}.parquet")
+            pd.DataFrame(self._rows, columns=FIELDS).to_parquet(part + ".tmp", index=False)
+            os.replace(part + ".tmp", part)
+            self._rows = []
+        self._last_flush = time.monotonic()
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_part or time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def __exit__(self, *exc):
+        self._flush()
+
+
+def find_sessions(archive_dir):
+    """Return the session directories in an archive, sorted by name."""
+    return sorted(
+        os.path.join(archive_dir, name) for name in os.listdir(archive_dir)
+        if os.path.isdir(os.path.join(archive_dir, name))
+    )
+
+
+def run(archive_dir, output, workers=None, chunksize=4, report_every=100):
+    """Score every not-yet-scored session in ``archive_dir`` into ``output``."""
+    sink = ParquetSink(output) if output.endswith(".parquet") else CsvSink(output)
+    done = sink.done_sessions()
+    sessions = [s for s in find_sessions(archive_dir) if os.path.basename(s) not in done]
+    print(f"{len(sessions)} sessions to score ({len(done)} already done)", file=sys.stderr)
+
+    start = time.perf_counter()
+    scored = 0
+    with sink, Pool(workers) as pool:
+        for row in pool.imap_unordered(analyze_session, sessions, chunksize=chunksize):
+            sink.write(row)
+            scored += 1
+            if scored % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{scored}/{len(sessions)} sessions, {scored / elapsed:.1f} sessions/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {scored} sessions in {elapsed:.1f}s ({rate:.1f} sessions/s)", file=sys.stderr)
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived CalmPulse sessions")
+    parser.add_argument("archive", help="directory containing one sub-directory per session")
+    parser.add_argument("output", help="results file (.csv) or Parquet directory (.parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4, help="sessions handed to a worker at a time")
+    args = parser.parse_args()
+    run(args.archive, args.output, args.workers, args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Streaming anomaly and spike detection for heart-rate (BPM) samples.
+
+Every subject keeps a small adaptive baseline (EWMA mean and variance) and a
+two-sided CUSUM statistic on the standardized residual. Each new sample is an
+O(1) update, so a single detector can follow thousands of subjects' streams.
+
+- A *spike* is a single reading far outside the baseline (|z| above
+  ``spike_z``). Spikes are clipped before they update the baseline so one
+  noisy reading cannot drag it around.
+- A *rise* / *drop* is a sustained shift detected by CUSUM. Each sample's
+  contribution is capped at ``cusum_clip`` so a lone spike can't trigger it.
+  The alert carries the onset timestamp, i.e. the sample where the statistic
+  started growing.
+"""
+import math
+from collections import namedtuple
+
+BpmAlert = namedtuple("BpmAlert", ["subject_id", "kind", "onset", "timestamp", "bpm", "score"])
+
+_NO_ALERTS = ()
+
+
+class _SubjectState:
+    """Per-subject baseline and CUSUM state."""
+
+    __slots__ = (
+        "mean", "var", "count",
+        "cusum_pos", "cusum_neg", "pos_onset", "neg_onset",
+        "pos_active", "neg_active", "spike_active",
+    )
+
+    def __init__(self, bpm, prior_std):
+        self.mean = float(bpm)
+        self.var = prior_std * prior_std
+        self.count = 1
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.pos_onset = None
+        self.neg_onset = None
+        self.pos_active = False
+        self.neg_active = False
+        self.spike_active = False
+
+
+class BpmAnomalyDetector:
+    """Detect spikes and sustained BPM changes over many subject streams.
+
+    Parameters
+    ----------
+    alpha : EWMA smoothing factor for the baseline mean and variance.
+    prior_std : Assumed BPM standard deviation before a subject has history.
+    min_std : Floor on the baseline standard deviation (avoids huge z-scores
+        on very flat signals).
+    spike_z : |z| above which a single reading is reported as a spike.
+    cusum_k : CUSUM slack, in standard deviations.
+    cusum_h : CUSUM decision threshold, in standard deviations.
+    cusum_clip : Cap on a single sample's |z| as fed to CUSUM; keep
+        ``cusum_clip - cusum_k`` below ``cusum_h`` so one reading can't
+        cross the threshold alone.
+    warmup : Number of samples per subject before alerts are emitted.
+    """
+
+    def __init__(self, alpha=0.05, prior_std=5.0, min_std=2.0, spike_z=4.0,
+                 cusum_k=0.5, cusum_h=4.0, cusum_clip=3.0, warmup=3):
+        self.alpha = alpha
+        self.prior_std = prior_std
+        self.min_std = min_std
+        self.spike_z = spike_z
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.cusum_clip = cusum_clip
+        self.warmup = warmup
+        self._subjects = {}
+
+    def update(self, subject_id, timestamp, bpm):
+        """Feed one sample and return a tuple of the alerts it triggered."""
+        state = self._subjects.get(subject_id)
+        if state is None:
+            self._subjects[subject_id] = _SubjectState(bpm, self.prior_std)
+            return _NO_ALERTS
+
+        std = max(math.sqrt(state.var), self.min_std)
+        z = (bpm - state.mean) / std
+        state.count += 1
+        alerts = _NO_ALERTS
+        armed = state.count > self.warmup
+
+        # Single-reading spikes
+        if abs(z) > self.spike_z:
+            if armed and not state.spike_active:
+                alerts = (BpmAlert(subject_id, "spike", timestamp, timestamp, bpm, z),)
+            state.spike_active = True
+        else:
+            state.spike_active = False
+
+        # Two-sided CUSUM on the standardized residual
+        z_step = max(-self.cusum_clip, min(self.cusum_clip, z))
+        if state.cusum_pos == 0.0:
+            state.pos_onset = timestamp
+        state.cusum_pos = max(0.0, state.cusum_pos + z_step - self.cusum_k)
+        if state.cusum_pos == 0.0:
+            state.pos_active = False
+        elif state.cusum_pos > self.cusum_h and not state.pos_active:
+            state.pos_active = True
+            if armed:
+                alert = BpmAlert(subject_id, "rise", state.pos_onset, timestamp, bpm, state.cusum_pos)
+                alerts += (alert,)
+
+        if state.cusum_neg == 0.0:
+            state.neg_onset = timestamp
+        state.cusum_neg = max(0.0, state.cusum_neg - z_step - self.cusum_k)
+        if state.cusum_neg == 0.0:
+            state.neg_active = False
+        elif state.cusum_neg > self.cusum_h and not state.neg_active:
+            state.neg_active = True
+            if armed:
+                alert = BpmAlert(subject_id, "drop", state.neg_onset, timestamp, bpm, state.cusum_neg)
+                alerts += (alert,)
+
+        # Adapt the baseline, clipping outliers so a spike can't drag it along
+        clipped = max(-self.spike_z, min(self.spike_z, z)) * std
+        state.mean += self.alpha * clipped
+        state.var = (1 - self.alpha) * (state.var + self.alpha * clipped * clipped)
+
+        return alerts
+
+    def update_many(self, subject_id, samples):
+        """Feed an iterable of ``(timestamp, bpm)`` pairs and return a list of all alerts."""
+        alerts = []
+        update = self.update
+        for timestamp, bpm in samples:
+            found = update(subject_id, timestamp, bpm)
+            if found:
+                alerts.extend(found)
+        return alerts
+
+    def baseline(self, subject_id):
+        """Return ``(mean, std)`` of the subject's current baseline, or None."""
+        state = self._subjects.get(subject_id)
+        if state is None:
+            return None
+        return state.mean, max(math.sqrt(state.var), self.min_std)
+
+    def reset(self, subject_id=None):
+        """Forget one subject's history, or every subject's if none is given."""
+        if subject_id is None:
+            self._subjects.clear()
+        else:
+            self._subjects.pop(subject_id, None)
+
+
+def detect_bpm_alerts(timestamps, bpms, subject_id="default", **params):
+    """Run a fresh detector over one recorded series and return its alerts."""
+    detector = BpmAnomalyDetector(**params)
+    return detector.update_many(subject_id, zip(timestamps, bpms))
@@ -0,0 +1,216 @@
+"""Ingestion server for BPM and volume samples from wearable devices.
+
+Devices (or a BLE bridge) send newline-delimited samples over TCP or UDP:
+
+    subject_id,kind,timestamp,value
+
+where ``kind`` is ``bpm`` or ``volume`` and ``timestamp`` is either
+``YYYY-MM-DD HH:MM:SS[.ffffff]`` in UTC or Unix epoch seconds (fractions
+allowed). Both are stored as UTC ``YYYY-MM-DD HH:MM:SS.ffffff``. Samples are
+buffered and written to the signal store in group commits; duplicates for the
+same subject/signal/timestamp within a batch are coalesced, and samples the
+store already has are counted as duplicates rather than written.
+
+TCP connections get backpressure: when the buffer is full the server stops
+reading from the socket until the writer catches up. UDP has no flow control,
+so datagrams that don't fit are dropped and counted.
+
+Run with:
+
+    python ingest_server.py --tcp-port 8765 --udp-port 8766 --db signals.db
+"""
+import argparse
+import asyncio
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from signal_store import DEFAULT_DB_PATH, SIGNAL_KINDS, connect, write_samples
+
+
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _normalize_timestamp(raw):
+    # The store's rollup buckets and ordering rely on this exact fixed-width
+    # format, microseconds included so sub-second samples keep distinct keys
+    if raw[4:5] == "-":
+        moment = datetime.strptime(raw, _TIMESTAMP_FORMAT if "." in raw else "%Y-%m-%d %H:%M:%S")
+    else:
+        moment = datetime.fromtimestamp(float(raw), timezone.utc)
+        if moment.year < 1000:
+            raise ValueError(raw)
+    return moment.strftime(_TIMESTAMP_FORMAT)
+
+
+def parse_samples(data):
+    """Parse a block of sample lines, returning ``(samples, n_rejected)``."""
+    samples = []
+    rejected = 0
+    for line in data.decode("utf-8", "replace").splitlines():
+        if not line:
+            continue
+        try:
+            subject_id, kind, timestamp, value = line.split(",")
+            if kind not in SIGNAL_KINDS:
+                raise ValueError(kind)
+            value = float(value)
+            if not math.isfinite(value):
+                raise ValueError(value)
+            samples.append((subject_id, kind, _normalize_timestamp(timestamp), value))
+        except (ValueError, OverflowError, OSError):
+            rejected += 1
+    return samples, rejected
+
+
+class BatchWriter:
+    """Buffer incoming samples and flush them to the store in group commits."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, batch_size=5000, flush_interval=0.05, max_pending=100000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.stats = {"accepted": 0, "written": 0, "duplicates": 0, "dropped": 0, "rejected": 0, "commits": 0}
+        self._pending = []
+        self._has_data = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        # sqlite connections are used from the single writer thread only
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._conn = None
+
+    async def put(self, samples):
+        """Queue samples, waiting while the buffer is full (backpressure)."""
+        while len(self._pending) >= self.max_pending:
+            self._has_room.clear()
+            await self._has_room.wait()
+        self._pending.extend(samples)
+        self.stats["accepted"] += len(samples)
+        self._has_data.set()
+
+    def offer(self, samples):
+        """Queue as many samples as fit without waiting; drop the rest."""
+        room = self.max_pending - len(self._pending)
+        if room < len(samples):
+            self.stats["dropped"] += len(samples) - max(room, 0)
+            samples = samples[:max(room, 0)]
+        if samples:
+            self._pending.extend(samples)
+            self.stats["accepted"] += len(samples)
+            self._has_data.set()
+
+    def _write(self, batch):
+        if self._conn is None:
+            self._conn = connect(self.db_path, check_same_thread=False)
+        return write_samples(self._conn, batch)
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._has_data.clear()
+        self._has_room.set()
+        # Coalesce repeated samples, keeping the latest value
+        coalesced = {(s[0], s[1], s[2]): s for s in batch}
+        self.stats["duplicates"] += len(batch) - len(coalesced)
+        loop = asyncio.get_running_loop()
+        try:
+            written = await loop.run_in_executor(self._executor, self._write, list(coalesced.values()))
+        except Exception as e:
+            # Drop the batch rather than letting one bad write stop ingestion
+            self.stats["dropped"] += len(coalesced)
+            print(f"Dropped a batch of {len(coalesced)} samples: {e!r}", file=sys.stderr)
+            return
+        self.stats["written"] += written
+        self.stats["duplicates"] += len(coalesced) - written
+        self.stats["commits"] += 1
+
+    async def run(self):
+        """Flush whenever a batch fills up or the flush interval elapses."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_data.wait()
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size and loop.time() < deadline:
+                await asyncio.sleep(min(0.005, self.flush_interval))
+            await self._flush()
+
+    async def close(self):
+        """Flush anything still buffered and release the store."""
+        if self._pending:
+            await self._flush()
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown()
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, writer):
+        self.writer = writer
+
+    def datagram_received(self, data, addr):
+        samples, rejected = parse_samples(data)
+        self.writer.stats["rejected"] += rejected
+        self.writer.offer(samples)
+
+
+def _tcp_handler(writer):
+    async def handle(reader, stream_writer):
+        remainder = b""
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                chunk = remainder + chunk
+                cut = chunk.rfind(b"\n") + 1
+                remainder = chunk[cut:]
+                samples, rejected = parse_samples(chunk[:cut])
+                writer.stats["rejected"] += rejected
+                await writer.put(samples)
+            if remainder:
+                samples, rejected = parse_samples(remainder)
+                writer.stats["rejected"] += rejected
+                await writer.put(samples)
+        finally:
+            stream_writer.close()
+    return handle
+
+
+async def serve(host="127.0.0.1", tcp_port=8765, udp_port=8766, db_path=DEFAULT_DB_PATH, report_interval=10.0):
+    """Run the TCP and UDP listeners until cancelled."""
+    writer = BatchWriter(db_path)
+    loop = asyncio.get_running_loop()
+    flusher = asyncio.create_task(writer.run())
+    server = await asyncio.start_server(_tcp_handler(writer), host, tcp_port)
+    transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(writer), local_addr=(host, udp_port))
+    print(f"Listening on tcp://{host}:{tcp_port} and udp://{host}:{udp_port}, writing to {db_path}")
+    try:
+        last_written = 0
+        while True:
+            await asyncio.sleep(report_interval)
+            rate = (writer.stats["written"] - last_written) / report_interval
+            last_written = writer.stats["written"]
+            print(f"{rate:,.0f} samples/s  {writer.stats}")
+    finally:
+        transport.close()
+        server.close()
+        flusher.cancel()
+        await writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CalmPulse wearable ingestion server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tcp-port", type=int, default=8765)
+    parser.add_argument("--udp-port", type=int, default=8766)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.tcp_port, args.udp_port, args.db))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,177 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import plotly.graph_objects as go
+from analysis import RADAR_LABELS
+from signal_hub import BpmMonitor, SignalHub, build_frame
+from signal_store import list_subjects
 
-# Load synthetic data
-heartbeat_df = pd.read_csv("heartBeat.csv")
-audio_volume_df = pd.read_csv("audio_volume.csv")
+st.set_page_config(page_title="Autism Emotion Detector", layout="wide")
 
 # Simulated transcript
 transcript = "I... I don't want to go. I don't want to. Please. Please. It's too loud. It's too loud. I don't like it. I want to go home. I want mom. I want mom."
 
-# Analyze sentiment
-analyzer = SentimentIntensityAnalyzer()
-sentiment_score = analyzer.polarity_scores(transcript)
 
-# Detect word repetition
-words = transcript.lower().replace('.', '').split()
-repetition_count = sum([1 for i in range(1, len(words)) if words[i] == words[i-1]])
+@st.cache_resource
+def get_signal_hub():
+    """One hub per process, shared by every session watching CalmPulse"""
+    # The monitor keeps each subject's detector between ticks, so only new samples are scored
+    bpm_monitor = BpmMonitor()
+    return SignalHub(lambda subject_id: build_frame(subject_id, transcript, bpm_monitor)).start()
+
+
+# Subscribe to the selected subject (falls back to the synthetic CSVs)
+subjects = list_subjects()
+subject_id = st.sidebar.selectbox("Subject", subjects) if subjects else None
+
+
+def current_subscription():
+    """This session's subscription to the selected subject"""
+    subscription = st.session_state.get('calmpulse_subscription')
+    # Resubscribe when the subject changed or the hub expired an idle subscription
+    if subscription is None or subscription.subject_id != subject_id or not subscription.active:
+        if subscription is not None:
+            subscription.close()
+        subscription = get_signal_hub().subscribe(subject_id)
+        st.session_state['calmpulse_subscription'] = subscription
+        st.session_state.pop('calmpulse_frame', None)
+    return subscription
+
+
+# Poll on the hub's own schedule; only this fragment reruns, never blocking on a frame
+@st.fragment(run_every=get_signal_hub().interval)
+def show_live_signals():
+    """Render the newest frame published for the selected subject"""
+    # Take the newest published frame, or keep showing the last one if nothing new arrived
+    frame = current_subscription().latest(timeout=0)
+    if frame is None:
+        frame = st.session_state.get('calmpulse_frame')
+    if frame is None:
+        st.info("Waiting for the first signal update...")
+        return
+    if 'error' in frame:
+        st.error(f"Could not compute signals: {frame['error']}")
+        return
+    st.session_state['calmpulse_frame'] = frame
+    show_frame(frame)
+
+
+def show_frame(frame):
+    """Draw the dashboard for one published frame"""
+    heartbeat_df = frame['heartbeat']
+    audio_volume_df = frame['volume']
+    sentiment_score = frame['sentiment_score']
+    repetition_count = frame['repetition_count']
+    repetition_alert = frame['repetition_alert']
+
+    # Emotion label
+    if frame['emotion'] == "Anxious":
+        emotion = "Anxious / Needs Help"
+    else:
+        emotion = "Stable"
+
+    # Display emotion state
+    st.subheader("Current Detected Emotion")
+    st.markdown(f"### {emotion}")
+
+    # Layout
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Heartbeat Over Time")
+        fig, ax = plt.subplots()
+        ax.plot(pd.to_datetime(heartbeat_df['timestamp']), heartbeat_df['bpm'], marker='o')
+        ax.set_ylabel("BPM")
+        ax.set_xlabel("Time")
+        ax.set_title("Heartbeat Data")
+        st.pyplot(fig)
+        plt.close(fig)  # the fragment reruns every tick, so don't let figures pile up
+
+    with col2:
+        st.subheader("Voice Volume Levels")
+        fig2, ax2 = plt.subplots()
+        ax2.plot(audio_volume_df['time_step'], audio_volume_df['volume'], color='orange', marker='s')
+        ax2.set_ylabel("Volume")
+        ax2.set_xlabel("Time Step")
+        ax2.set_title("Audio Volume Over Time")
+        st.pyplot(fig2)
+        plt.close(fig2)
+
+    # Transcript analysis
+    st.subheader("Speech Transcript")
+    st.text_area("Transcript:", transcript, height=150)
+
+    st.markdown("---")
+    st.write("🔍 Sentiment Score:", sentiment_score)
+    st.write("🔁 Repetition Count:", repetition_count)
+    st.write("❤️ Max BPM:", frame['max_bpm'] if frame['max_bpm'] is not None else "No data")
+    st.write("🚨 BPM Alerts:", len(frame['bpm_alerts']))
+    st.write("🔊 Avg Volume:", round(frame['avg_volume'], 2) if frame['avg_volume'] is not None else "No data")
+
+    # Radar indicators for every time window, played back client-side so
+    # scrubbing through a long session doesn't rerun the script
+    radar_starts = frame['radar_starts']
+    radar_values = frame['radar_values']
+    if len(radar_starts) == 0:
+        st.info("No heartbeat samples for this subject yet, so there is no emotion radar to show.")
+        return
+    labels = RADAR_LABELS + [RADAR_LABELS[0]]  # Close the loop
+    closed_values = np.concatenate([radar_values, radar_values[:, :1]], axis=1)
+    # Plotly finds frames by name, so names must be unique; the time is only a label
+    frame_names = [str(i) for i in range(len(radar_starts))]
+    start_times = pd.to_datetime(radar_starts)
+    time_format = '%H:%M:%S' if start_times[0].date() == start_times[-1].date() else '%Y-%m-%d %H:%M'
+    step_labels = [start.strftime(time_format) for start in start_times]
+
+    def radar_trace(values):
+        return go.Scatterpolar(
+            r=values,
+            theta=labels,
+            fill='toself',
+            name='Emotion Indicators',
+            line_color='crimson'
+        )
 
-# Emotion detection logic
-high_bpm = heartbeat_df['bpm'].max() > 100
-high_volume = audio_volume_df['volume'].mean() > 0.4
-repetition_alert = repetition_count >= 2
-negative_sentiment = sentiment_score['compound'] < -0.3
+    fig_radar = go.Figure(
+        data=[radar_trace(closed_values[-1])],
+        frames=[go.Frame(data=[radar_trace(values)], name=name)
+                for values, name in zip(closed_values, frame_names)]
+    )
+
+    play_args = dict(frame=dict(duration=300, redraw=True), transition=dict(duration=0), fromcurrent=True)
+    fig_radar.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )
+        ),
+        showlegend=False,
+        title="Emotion Radar Chart",
+        updatemenus=[dict(
+            type='buttons',
+            showactive=False,
+            x=0, y=0, xanchor='left', yanchor='top',
+            buttons=[
+                dict(label='▶ Play', method='animate', args=[None, play_args]),
+                dict(label='⏸ Pause', method='animate',
+                     args=[[None], dict(frame=dict(duration=0, redraw=False), mode='immediate')]),
+            ]
+        )],
+        sliders=[dict(
+            active=len(frame_names) - 1,
+            currentvalue=dict(prefix='Window starting '),
+            pad=dict(t=40),
+            steps=[dict(label=label, method='animate',
+                        args=[[name], dict(frame=dict(duration=0, redraw=True), mode='immediate')])
+                   for name, label in zip(frame_names, step_labels)]
+        )]
+    )
+
+    st.plotly_chart(fig_radar, use_container_width=True)
 
-# Emotion label
-if high_bpm and high_volume and repetition_alert and negative_sentiment:
-    emotion = "Anxious / Needs Help"
-else:
-    emotion = "Stable"
 
 # Streamlit UI
-st.set_page_config(page_title="Autism Emotion Detector", layout="wide")
 st.title("🧠 Autism Emotion Detection MVP")
-
-# Display emotion state
-st.subheader("Current Detected Emotion")
-st.markdown(f"### {emotion}")
-
-# Layout
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader("Heartbeat Over Time")
-    fig, ax = plt.subplots()
-    ax.plot(pd.to_datetime(heartbeat_df['timestamp']), heartbeat_df['bpm'], marker='o')
-    ax.set_ylabel("BPM")
-    ax.set_xlabel("Time")
-    ax.set_title("Heartbeat Data")
-    st.pyplot(fig)
-
-with col2:
-    st.subheader("Voice Volume Levels")
-    fig2, ax2 = plt.subplots()
-    ax2.plot(audio_volume_df['time_step'], audio_volume_df['volume'], color='orange', marker='s')
-    ax2.set_ylabel("Volume")
-    ax2.set_xlabel("Time Step")
-    ax2.set_title("Audio Volume Over Time")
-    st.pyplot(fig2)
-
-# Transcript analysis
-st.subheader("Speech Transcript")
-st.text_area("Transcript:", transcript, height=150)
-
-st.markdown("---")
-st.write("🔍 Sentiment Score:", sentiment_score)
-st.write("🔁 Repetition Count:", repetition_count)
-st.write("❤️ Max BPM:", heartbeat_df['bpm'].max())
-st.write("🔊 Avg Volume:", round(audio_volume_df['volume'].mean(), 2))
-
-# Normalize and prepare radar chart values
-max_bpm_norm = min(heartbeat_df['bpm'].max() / 150, 1)  # assuming 150 BPM max for scale
-avg_volume_norm = min(audio_volume_df['volume'].mean(), 1)  # volume already 0-1 scale
-repetition_norm = 1 if repetition_alert else 0
-negative_sentiment_norm = abs(sentiment_score['compound']) if sentiment_score['compound'] < 0 else 0
-
-labels = ['Max BPM', 'Avg Volume', 'Repetition Alert', 'Negative Sentiment']
-values = [max_bpm_norm, avg_volume_norm, repetition_norm, negative_sentiment_norm]
-
-fig_radar = go.Figure()
-
-fig_radar.add_trace(go.Scatterpolar(
-    r=values + [values[0]],  # Close the loop
-    theta=labels + [labels[0]],
-    fill='toself',
-    name='Emotion Indicators',
-    line_color='crimson'
-))
-
-fig_radar.update_layout(
-    polar=dict(
-        radialaxis=dict(
-            visible=True,
-            range=[0, 1]
-        )
-    ),
-    showlegend=False,
-    title="Emotion Radar Chart"
-)
-
-st.plotly_chart(fig_radar, use_container_width=True)
+show_live_signals()
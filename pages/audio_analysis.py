@@ -1,13 +1,11 @@
 import streamlit as st
 import speech_recognition as sr
-import librosa
 import soundfile as sf
 import numpy as np
 import tempfile
 import matplotlib.pyplot as plt
-from collections import Counter
-import re
 import time
+from analysis import average_pitch, load_audio, pitch_track, top_terms, volume_series
 
 st.set_page_config(page_title="Audio Analysis", layout="wide")
 
@@ -37,27 +35,19 @@ def record_and_analyze():
         st.write(transcript)
 
         # --- Term Frequency ---
-        words = re.findall(r'\w+', transcript.lower())
-        freq = Counter(words)
-        common_words = freq.most_common(10)
+        common_words = top_terms(transcript, 10)
 
         # --- Pitch Analysis ---
-        y, sr_rate = librosa.load(wav_path)
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr_rate)
-        pitch_values = pitches[magnitudes > np.median(magnitudes)]
-        avg_pitch = np.mean(pitch_values) if len(pitch_values) > 0 else 0
+        y, sr_rate = load_audio(wav_path)
+        pitches, magnitudes = pitch_track(y, sr_rate)
+        avg_pitch = average_pitch(pitches, magnitudes)
 
         st.metric("🎼 Average Pitch (Hz)", f"{avg_pitch:.2f}")
         
         
         # Store values in session state after processing
        # --- Volume Analysis ---
-        frame_size = int(sr_rate / 10)  # 100ms frames
-        volume_data = np.array([
-            np.mean(np.abs(y[i:i + frame_size]))
-            for i in range(0, len(y), frame_size)
-        ])
-        volume_timestamps = [round(i * 0.1, 2) for i in range(len(volume_data))]  # in seconds
+        volume_data, volume_timestamps = volume_series(y, sr_rate)  # 100ms frames, timestamps in seconds
 
         # Save to session state
         st.session_state['transcript'] = transcript
@@ -7,6 +7,9 @@ from plotly.subplots import make_subplots
 import random
 import time
 from datetime import datetime, timedelta
+from bpm_detector import detect_bpm_alerts
+from signal_store import (latest_timestamp, latest_value, list_subjects, load_bpm_df, query_rollup,
+                          rollup_series, summary_histogram)
 
 # Page configuration
 st.set_page_config(
@@ -16,16 +19,37 @@ st.set_page_config(
     page_icon="❤️"
 )
 
-def show_heartbeat_detector():
+# Raw samples are only loaded for this much recent history; the trend before
+# it is drawn from the hourly rollups
+RECENT_WINDOW = timedelta(hours=6)
+
+
+def load_heart_rate(subject_id=None):
+    """Load the recent raw BPM samples and the hourly trend that precedes them"""
+    if subject_id is None:
+        return load_bpm_df(), None
+    latest = pd.Timestamp(latest_timestamp(subject_id, "bpm"))
+    since = (latest - RECENT_WINDOW).floor("h").to_pydatetime()
+    return load_bpm_df(subject_id, since=since), rollup_series(subject_id, "bpm", "hour", end=since)
+
+def show_heartbeat_detector(subject_id=None, heartbeat_df=None):
     """Display animated heartbeat detector with real-time monitoring"""
     
+    # Streamed subjects are summarized from the precomputed rollups
+    summary = query_rollup(subject_id, "bpm")
+
     # Try to load actual heartbeat data, fallback to simulated data
     try:
-        heartbeat_df = pd.read_csv("heartBeat.csv")
-        current_bpm = heartbeat_df['bpm'].iloc[-1]  # Get latest BPM
-        avg_bpm = heartbeat_df['bpm'].mean()
-        max_bpm = heartbeat_df['bpm'].max()
-        min_bpm = heartbeat_df['bpm'].min()
+        if summary is not None:
+            current_bpm = latest_value(subject_id, "bpm")
+            avg_bpm = summary.total / summary.count
+            max_bpm = summary.max
+            min_bpm = summary.min
+        else:
+            current_bpm = heartbeat_df['bpm'].iloc[-1]  # Get latest BPM
+            avg_bpm = heartbeat_df['bpm'].mean()
+            max_bpm = heartbeat_df['bpm'].max()
+            min_bpm = heartbeat_df['bpm'].min()
     except:
         # Simulated heartbeat data if CSV not available
         current_bpm = random.randint(85, 120)
@@ -232,11 +256,13 @@ def show_breathing_activity():
     
     st.balloons()
 
-def show_heart_rate_history():
+def show_heart_rate_history(subject_id=None, heartbeat_df=None, trend_df=None, alerts=()):
     """Display heart rate trends and history"""
     
     try:
-        heartbeat_df = pd.read_csv("heartBeat.csv")
+        if heartbeat_df is None:
+            raise ValueError("no heart rate samples loaded")
+        heartbeat_df = heartbeat_df.copy()
         
         # Convert timestamp to datetime if it's not already
         if 'timestamp' in heartbeat_df.columns:
@@ -270,23 +296,50 @@ def show_heart_rate_history():
             row=1, col=1
         )
         
+        # Older history, summarized per hour from the rollups
+        if trend_df is not None and len(trend_df):
+            fig.add_trace(
+                go.Scatter(
+                    x=trend_df['timestamp'],
+                    y=trend_df['mean'],
+                    mode='lines',
+                    name='Hourly average BPM',
+                    line=dict(color='firebrick', width=2, dash='dot')
+                ),
+                row=1, col=1
+            )
+        
         # Add threshold lines
         fig.add_hline(y=100, line_dash="dash", line_color="orange", 
                      annotation_text="High BPM Threshold", row=1, col=1)
         fig.add_hline(y=60, line_dash="dash", line_color="blue", 
                      annotation_text="Low BPM Threshold", row=1, col=1)
         
-        # Histogram
-        fig.add_trace(
-            go.Histogram(
+        # Mark the onset of detected anomalies
+        for alert in alerts:
+            fig.add_vline(x=alert.onset, line_dash="dot", line_color="crimson", row=1, col=1)
+        
+        # Histogram, merged from the rollup sketches for streamed subjects
+        summary = query_rollup(subject_id, "bpm")
+        if summary is not None:
+            centers, counts, width = summary_histogram(summary, "bpm", bins=20)
+            distribution = go.Bar(
+                x=centers,
+                y=counts,
+                width=width,
+                name='BPM Distribution',
+                marker_color='lightcoral',
+                opacity=0.7
+            )
+        else:
+            distribution = go.Histogram(
                 x=heartbeat_df['bpm'],
                 nbinsx=20,
                 name='BPM Distribution',
                 marker_color='lightcoral',
                 opacity=0.7
-            ),
-            row=2, col=1
-        )
+            )
+        fig.add_trace(distribution, row=2, col=1)
         
         fig.update_layout(
             title="Heart Rate Analysis Dashboard",
@@ -323,6 +376,24 @@ def show_heart_rate_history():
         ax.grid(True, alpha=0.3)
         st.pyplot(fig)
 
+def show_bpm_alerts(alerts):
+    """List spikes and sustained BPM changes found by the streaming detector"""
+    
+    if not alerts:
+        st.success("No spikes or sustained changes detected against the adaptive baseline.")
+        return alerts
+    
+    labels = {
+        "spike": "⚡ Sudden spike",
+        "rise": "📈 Sustained rise",
+        "drop": "📉 Sustained drop",
+    }
+    for alert in alerts:
+        st.warning(f"**{labels[alert.kind]}** starting at {alert.onset} "
+                   f"(detected at {alert.timestamp}, {alert.bpm} BPM)")
+    
+    return alerts
+
 def show_heart_rate_insights(current_bpm, avg_bpm, max_bpm, min_bpm):
     """Display insights and recommendations based on heart rate data"""
     
@@ -366,12 +437,29 @@ def show_heart_rate_insights(current_bpm, avg_bpm, max_bpm, min_bpm):
         - Keep up the good work!
         """)
 
+# Subjects streamed in through the ingestion server, if any
+subjects = list_subjects()
+subject_id = st.sidebar.selectbox("Subject", subjects) if subjects else None
+
 # Main page content
 st.title("❤️ Heart Rate Monitor")
 st.markdown("### Real-time cardiovascular monitoring for autism support")
 
+# A subject may only have streamed volume so far; don't stand in demo data for it
+if subject_id is not None and query_rollup(subject_id, "bpm") is None:
+    st.info(f"No heart rate samples recorded for {subject_id} yet.")
+    st.stop()
+
+# Load the raw samples once per render and run the detector over them once
+try:
+    heartbeat_df, trend_df = load_heart_rate(subject_id)
+    bpm_alerts = detect_bpm_alerts(heartbeat_df['timestamp'], heartbeat_df['bpm'])
+except Exception as e:
+    st.error(f"Could not load heart rate data: {e}")
+    heartbeat_df, trend_df, bpm_alerts = None, None, []
+
 # Real-time heart rate display
-current_bpm, status, avg_bpm, max_bpm, min_bpm = show_heartbeat_detector()
+current_bpm, status, avg_bpm, max_bpm, min_bpm = show_heartbeat_detector(subject_id, heartbeat_df)
 
 # Quick action buttons
 st.markdown("---")
@@ -395,10 +483,15 @@ with col3:
 st.markdown("---")
 show_heart_rate_insights(current_bpm, avg_bpm, max_bpm, min_bpm)
 
+# Anomaly alerts
+st.markdown("---")
+st.subheader("🚨 Anomaly Alerts")
+show_bpm_alerts(bpm_alerts)
+
 # Heart rate history
 st.markdown("---")
 st.subheader("📈 Heart Rate History")
-show_heart_rate_history()
+show_heart_rate_history(subject_id, heartbeat_df, trend_df, bpm_alerts)
 
 # Recommendations based on current state
 st.markdown("---")
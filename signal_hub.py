@@ -0,0 +1,257 @@
+"""Process-wide publish/subscribe hub for live subject signals.
+
+Every Streamlit session watching a subject subscribes to the hub instead of
+loading and scoring the data itself. A single background thread computes one
+frame per watched subject per tick (feature snapshot, downsampled chart data
+and emotion label) and fans it out to all of that subject's subscribers.
+
+Each subscriber has a small bounded queue; when a slow client falls behind
+the oldest frames are dropped, so it always catches up on the newest one.
+Subscribers that stop polling are expired after ``idle_timeout`` seconds;
+callers should check ``Subscription.active`` and subscribe again when it is
+cleared.
+"""
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from analysis import (HIGH_VOLUME_THRESHOLD, REPETITION_THRESHOLD, NEGATIVE_SENTIMENT_THRESHOLD,
+                      analyze_sentiment, classify_emotion, count_repetitions, detector_has_high_bpm,
+                      radar_timeline)
+from bpm_detector import BpmAnomalyDetector
+from signal_store import load_bpm_df, load_volume_df
+
+
+def downsample(df, column, max_points=300, how="max"):
+    """Aggregate a frame to at most ``max_points`` rows for charting.
+
+    BPM uses ``max`` per bucket so short spikes stay visible.
+    """
+    if len(df) <= max_points:
+        return df
+    step = -(-len(df) // max_points)
+    first_col = df.columns[0]
+    return df.groupby(np.arange(len(df)) // step).agg({first_col: "first", column: how})
+
+
+class BpmMonitor:
+    """Follow every subject's BPM stream with one long-lived detector.
+
+    Each update feeds the detector only the samples newer than the last one
+    it saw, so a tick costs the new samples rather than a replay of the whole
+    history. The most recent ``max_alerts`` alerts are kept per subject.
+    Samples that arrive out of order, older than ones already seen, are not
+    scored.
+    """
+
+    def __init__(self, max_alerts=100, **params):
+        self.detector = BpmAnomalyDetector(**params)
+        self.max_alerts = max_alerts
+        self._last_seen = {}
+        self._alerts = {}
+
+    def update(self, subject_id, timestamps, bpms):
+        """Feed a subject's time-ordered samples; return ``(recent_alerts, high_bpm)``."""
+        timestamps = np.asarray(timestamps)
+        bpms = np.asarray(bpms, dtype=float)
+        last_seen = self._last_seen.get(subject_id)
+        if last_seen is not None and len(timestamps) and timestamps[-1] < last_seen:
+            # The history was replaced (e.g. a rebuilt store); start over
+            self.reset(subject_id)
+            last_seen = None
+        start = 0 if last_seen is None else np.searchsorted(timestamps, last_seen, side="right")
+        alerts = self._alerts.setdefault(subject_id, deque(maxlen=self.max_alerts))
+        alerts.extend(self.detector.update_many(subject_id, zip(timestamps[start:].tolist(), bpms[start:].tolist())))
+        if len(timestamps):
+            self._last_seen[subject_id] = timestamps[-1]
+        return list(alerts), detector_has_high_bpm(self.detector, subject_id, alerts)
+
+    def reset(self, subject_id):
+        self.detector.reset(subject_id)
+        self._last_seen.pop(subject_id, None)
+        self._alerts.pop(subject_id, None)
+
+
+def build_frame(subject_id, transcript, bpm_monitor=None):
+    """Compute everything the CalmPulse page shows for one subject.
+
+    Pass the same ``bpm_monitor`` on every call so only new BPM samples are
+    scored; without one the whole history is replayed. A subject may be
+    missing either signal; its indicators are then left out (``None``)
+    rather than filled in from the demo data.
+    """
+    heartbeat_df = load_bpm_df(subject_id)
+    audio_volume_df = load_volume_df(subject_id)
+    sentiment_score = analyze_sentiment(transcript)
+    repetition_count = count_repetitions(transcript)
+
+    has_bpm = len(heartbeat_df) > 0
+    has_volume = len(audio_volume_df) > 0
+    if bpm_monitor is None:
+        bpm_monitor = BpmMonitor()
+    bpm_alerts, high_bpm = bpm_monitor.update(subject_id, heartbeat_df['timestamp'], heartbeat_df['bpm'])
+    avg_volume = audio_volume_df['volume'].mean() if has_volume else None
+    high_volume = has_volume and avg_volume > HIGH_VOLUME_THRESHOLD
+    repetition_alert = repetition_count >= REPETITION_THRESHOLD
+    emotion, emoji = classify_emotion(high_bpm, high_volume, repetition_alert, sentiment_score['compound'])
+
+    radar_starts, radar_values = np.array([], dtype="datetime64[ns]"), np.empty((0, 4))
+    if has_bpm:
+        # Stored volume keeps its timestamps; the CSV fallback only has time steps
+        volume_times = None
+        if 'timestamp' in audio_volume_df.columns:
+            volume_times = pd.to_datetime(audio_volume_df['timestamp']).to_numpy()
+        radar_starts, radar_values = radar_timeline(
+            pd.to_datetime(heartbeat_df['timestamp']).to_numpy(), heartbeat_df['bpm'].to_numpy(),
+            audio_volume_df['volume'].to_numpy(), sentiment_score['compound'], repetition_alert,
+            volume_times=volume_times,
+        )
+
+    return {
+        "subject_id": subject_id,
+        "computed_at": time.time(),
+        "heartbeat": downsample(heartbeat_df, "bpm", how="max"),
+        "volume": downsample(audio_volume_df, "volume", how="mean"),
+        "max_bpm": heartbeat_df['bpm'].max() if has_bpm else None,
+        "avg_volume": avg_volume,
+        "sentiment_score": sentiment_score,
+        "repetition_count": repetition_count,
+        "high_bpm": high_bpm,
+        "bpm_alerts": bpm_alerts,
+        "high_volume": high_volume,
+        "repetition_alert": repetition_alert,
+        "negative_sentiment": sentiment_score['compound'] < NEGATIVE_SENTIMENT_THRESHOLD,
+        "emotion": emotion,
+        "emoji": emoji,
+        "radar_starts": radar_starts,
+        "radar_values": radar_values,
+    }
+
+
+class Subscription:
+    """A subscriber's bounded view of one subject's frames."""
+
+    def __init__(self, hub, subject_id, maxsize):
+        self.hub = hub
+        self.subject_id = subject_id
+        self.active = True
+        self.dropped = 0
+        self.last_poll = time.monotonic()
+        self._frames = deque(maxlen=maxsize)
+        self._ready = threading.Condition()
+
+    def _push(self, frame):
+        with self._ready:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._ready.notify_all()
+
+    def latest(self, timeout=None):
+        """Return the newest frame, discarding older queued ones.
+
+        Waits up to ``timeout`` seconds when nothing is queued yet and
+        returns None if no frame arrives.
+        """
+        self.last_poll = time.monotonic()
+        with self._ready:
+            if not self._frames and timeout:
+                self._ready.wait_for(lambda: self._frames, timeout)
+            if not self._frames:
+                return None
+            frame = self._frames[-1]
+            self.dropped += len(self._frames) - 1
+            self._frames.clear()
+            return frame
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class SignalHub:
+    """Compute each watched subject once per tick and fan frames out."""
+
+    def __init__(self, compute, interval=2.0, queue_size=2, idle_timeout=300.0):
+        self.compute = compute
+        self.interval = interval
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self._subscribers = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the publisher thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="signal-hub", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def subscribe(self, subject_id):
+        """Subscribe to a subject; the last published frame is delivered at once."""
+        subscription = Subscription(self, subject_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(subject_id, []).append(subscription)
+            frame = self._latest.get(subject_id)
+        if frame is not None:
+            subscription._push(frame)
+        else:
+            # New subject: compute now rather than waiting for the next tick
+            self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription; it receives no more frames and ``active`` is cleared."""
+        subscription.active = False
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.subject_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.subject_id, None)
+                self._latest.pop(subscription.subject_id, None)
+
+    def subscriber_count(self, subject_id=None):
+        with self._lock:
+            if subject_id is not None:
+                return len(self._subscribers.get(subject_id, []))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [s for subs in self._subscribers.values() for s in subs if s.last_poll < cutoff]
+        for subscription in idle:
+            self.unsubscribe(subscription)
+
+    def publish_once(self):
+        """Compute one frame per watched subject and fan it out."""
+        self._expire_idle()
+        with self._lock:
+            subject_ids = list(self._subscribers)
+        for subject_id in subject_ids:
+            try:
+                frame = self.compute(subject_id)
+            except Exception as e:
+                frame = {"subject_id": subject_id, "computed_at": time.time(), "error": str(e)}
+            with self._lock:
+                if subject_id not in self._subscribers:
+                    continue
+                self._latest[subject_id] = frame
+                subscribers = list(self._subscribers[subject_id])
+            for subscription in subscribers:
+                subscription._push(frame)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.publish_once()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -0,0 +1,367 @@
+"""SQLite-backed store for BPM and volume samples from wearable devices.
+
+The ingestion server (ingest_server.py) writes here in batched group commits;
+the Streamlit pages read from here and fall back to the bundled CSV files
+when the store is empty or missing.
+
+Alongside the raw samples the store keeps per-minute, per-hour and per-day
+rollups (count, sum, sum of squares, min, max and a fixed-bin histogram),
+updated in the same transaction as each write. Metrics and distributions for
+a time range are answered by merging a handful of rollup rows instead of
+scanning the raw samples.
+"""
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+DEFAULT_DB_PATH = os.environ.get("CALMPULSE_DB", "signals.db")
+SIGNAL_KINDS = ("bpm", "volume")
+
+# Fixed histogram bins per signal: (low, high, number of bins). Values outside
+# the range land in the edge bins.
+HISTOGRAM_BINS = {
+    "bpm": (30.0, 230.0, 200),
+    "volume": (0.0, 1.0, 100),
+}
+
+# Rollup resolutions, coarsest first, with the timestamp prefix length that
+# identifies a bucket ("YYYY-MM-DD", "YYYY-MM-DD HH", "YYYY-MM-DD HH:MM")
+ROLLUP_RESOLUTIONS = (("day", 10), ("hour", 13), ("minute", 16))
+_BUCKET_FORMATS = {"day": "%Y-%m-%d", "hour": "%Y-%m-%d %H", "minute": "%Y-%m-%d %H:%M"}
+
+RollupSummary = namedtuple("RollupSummary", ["count", "total", "total_sq", "min", "max", "hist"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    subject_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (subject_id, kind, timestamp)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollups (
+    subject_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    total_sq REAL NOT NULL,
+    min_value REAL NOT NULL,
+    max_value REAL NOT NULL,
+    hist BLOB NOT NULL,
+    PRIMARY KEY (subject_id, kind, resolution, bucket)
+) WITHOUT ROWID;
+
+CREATE TEMP TABLE IF NOT EXISTS incoming (
+    subject_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (subject_id, kind, timestamp)
+);
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (subject_id, kind, resolution, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    total = total + excluded.total,
+    total_sq = total_sq + excluded.total_sq,
+    min_value = min(min_value, excluded.min_value),
+    max_value = max(max_value, excluded.max_value),
+    hist = hist_merge(hist, excluded.hist)
+"""
+
+
+def _hist_merge(a, b):
+    return (np.frombuffer(a, np.uint32) + np.frombuffer(b, np.uint32)).tobytes()
+
+
+def _bin_index(kind, value):
+    low, high, bins = HISTOGRAM_BINS[kind]
+    index = int((value - low) * bins / (high - low))
+    return 0 if index < 0 else bins - 1 if index >= bins else index
+
+
+def connect(path=DEFAULT_DB_PATH, check_same_thread=True):
+    """Open the store, creating the schema if needed."""
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+    # WAL lets the dashboard read while the ingestion server is writing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    conn.create_function("hist_merge", 2, _hist_merge, deterministic=True)
+    return conn
+
+
+def _rollup_rows(samples):
+    """Aggregate samples into rollup rows for every resolution."""
+    by_kind = {}
+    for sample in samples:
+        by_kind.setdefault(sample[1], []).append(sample)
+    rows = []
+    for kind, kind_samples in by_kind.items():
+        low, high, bins = HISTOGRAM_BINS[kind]
+        values = np.fromiter((sample[3] for sample in kind_samples), float, len(kind_samples))
+        bin_index = np.clip(np.floor((values - low) * bins / (high - low)), 0, bins - 1).astype(np.intp)
+        for resolution, width in ROLLUP_RESOLUTIONS:
+            # Number the buckets in this batch, then aggregate each one with numpy
+            buckets = {}
+            codes = np.fromiter(
+                (buckets.setdefault((sample[0], sample[2][:width]), len(buckets)) for sample in kind_samples),
+                np.intp, len(kind_samples),
+            )
+            n = len(buckets)
+            counts = np.bincount(codes, minlength=n)
+            totals = np.bincount(codes, values, minlength=n)
+            totals_sq = np.bincount(codes, values * values, minlength=n)
+            lows = np.full(n, np.inf)
+            np.minimum.at(lows, codes, values)
+            highs = np.full(n, -np.inf)
+            np.maximum.at(highs, codes, values)
+            hists = np.bincount(codes * bins + bin_index, minlength=n * bins).astype(np.uint32).reshape(n, bins)
+            for (subject_id, bucket), i in buckets.items():
+                rows.append((subject_id, kind, resolution, bucket, int(counts[i]), float(totals[i]),
+                             float(totals_sq[i]), float(lows[i]), float(highs[i]), hists[i].tobytes()))
+    return rows
+
+
+def write_samples(conn, samples):
+    """Write ``(subject_id, kind, timestamp, value)`` rows in one transaction.
+
+    Samples already in the store (same subject, signal and timestamp) are
+    ignored, so resent samples are not counted twice in the rollups. Within a
+    batch the last sample for a key wins. Returns the number of new samples.
+    """
+    with conn:
+        conn.execute("DELETE FROM incoming")
+        conn.executemany("INSERT OR REPLACE INTO incoming VALUES (?, ?, ?, ?)", samples)
+        new = conn.execute(
+            "SELECT * FROM incoming AS i WHERE NOT EXISTS (SELECT 1 FROM samples AS s WHERE "
+            "s.subject_id = i.subject_id AND s.kind = i.kind AND s.timestamp = i.timestamp)"
+        ).fetchall()
+        conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", new)
+        conn.executemany(_UPSERT_ROLLUP, _rollup_rows(new))
+    return len(new)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from the raw samples (e.g. for an older store)."""
+    with conn:
+        conn.execute("DELETE FROM rollups")
+        cursor = conn.execute("SELECT * FROM samples")
+        while True:
+            rows = cursor.fetchmany(50000)
+            if not rows:
+                break
+            conn.executemany(_UPSERT_ROLLUP, _rollup_rows(rows))
+
+
+def _floor(moment, resolution):
+    if resolution == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def _ceil(moment, resolution):
+    floored = _floor(moment, resolution)
+    if floored == moment:
+        return moment
+    step = {"day": timedelta(days=1), "hour": timedelta(hours=1)}.get(resolution, timedelta(minutes=1))
+    return floored + step
+
+
+def _as_datetime(moment, default):
+    if moment is None:
+        return default
+    if isinstance(moment, str):
+        return datetime.fromisoformat(moment)
+    return moment
+
+
+def _cover(start, end, level=0):
+    """Split ``[start, end)`` into the fewest day/hour/minute bucket ranges."""
+    resolution = ROLLUP_RESOLUTIONS[level][0]
+    if level == len(ROLLUP_RESOLUTIONS) - 1:
+        return [(resolution, start, end)] if start < end else []
+    inner_start, inner_end = _ceil(start, resolution), _floor(end, resolution)
+    if inner_start >= inner_end:
+        return _cover(start, end, level + 1)
+    return (_cover(start, inner_start, level + 1)
+            + [(resolution, inner_start, inner_end)]
+            + _cover(inner_end, end, level + 1))
+
+
+def merge_rollups(rows):
+    """Merge ``(count, total, total_sq, min, max, hist)`` rows into one summary."""
+    count, total, total_sq, low, high, hist = 0, 0.0, 0.0, None, None, None
+    for row_count, row_total, row_sq, row_min, row_max, row_hist in rows:
+        count += row_count
+        total += row_total
+        total_sq += row_sq
+        low = row_min if low is None else min(low, row_min)
+        high = row_max if high is None else max(high, row_max)
+        if hist is None:
+            hist = np.frombuffer(row_hist, np.uint32).astype(np.int64)
+        else:
+            hist += np.frombuffer(row_hist, np.uint32)
+    if not count:
+        return None
+    return RollupSummary(count, total, total_sq, low, high, hist.tolist())
+
+
+def query_rollup(subject_id, kind, start=None, end=None, path=DEFAULT_DB_PATH):
+    """Summarize a subject's signal over ``[start, end)`` from the rollups.
+
+    ``start`` and ``end`` are datetimes (or ISO strings), aligned down to the
+    minute; leaving both out summarizes the whole history. Returns None when
+    there are no samples in range.
+    """
+    if subject_id is None or not os.path.exists(path):
+        return None
+    conn = connect(path)
+    try:
+        select = ("SELECT count, total, total_sq, min_value, max_value, hist FROM rollups "
+                  "WHERE subject_id = ? AND kind = ? AND resolution = ?")
+        if start is None and end is None:
+            return merge_rollups(conn.execute(select, (subject_id, kind, "day")))
+        start = _floor(_as_datetime(start, datetime(1970, 1, 1)), "minute")
+        end = _floor(_as_datetime(end, datetime(9999, 12, 31)), "minute")
+        rows = []
+        for resolution, lo, hi in _cover(start, end):
+            fmt = _BUCKET_FORMATS[resolution]
+            rows.extend(conn.execute(select + " AND bucket >= ? AND bucket < ?",
+                                     (subject_id, kind, resolution, lo.strftime(fmt), hi.strftime(fmt))))
+        return merge_rollups(rows)
+    finally:
+        conn.close()
+
+
+def summary_histogram(summary, kind, bins=20):
+    """Coarsen a summary's fixed-bin histogram to about ``bins`` bars.
+
+    Only the span between the observed min and max is shown. Returns
+    ``(bin_centers, counts, bin_width)``.
+    """
+    low, high, n_bins = HISTOGRAM_BINS[kind]
+    fine_width = (high - low) / n_bins
+    first, last = _bin_index(kind, summary.min), _bin_index(kind, summary.max)
+    group = max(1, -(-(last - first + 1) // bins))
+    centers, counts = [], []
+    for i in range(first, last + 1, group):
+        centers.append(low + (i + group / 2) * fine_width)
+        counts.append(sum(summary.hist[i:i + group]))
+    return centers, counts, group * fine_width
+
+
+def rollup_series(subject_id, kind, resolution="hour", start=None, end=None, path=DEFAULT_DB_PATH):
+    """Return a subject's rollups at one resolution as a time series.
+
+    The frame has one row per bucket lying within ``[start, end)`` (``start``
+    is aligned down to the resolution), with ``timestamp`` (bucket start),
+    ``count``, ``mean``, ``min`` and ``max``.
+    """
+    columns = ["timestamp", "count", "mean", "min", "max"]
+    if subject_id is None or not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+    fmt = _BUCKET_FORMATS[resolution]
+    start = _floor(_as_datetime(start, datetime(1970, 1, 1)), resolution)
+    end = _as_datetime(end, datetime(9999, 12, 31))
+    conn = connect(path)
+    try:
+        df = pd.read_sql_query(
+            "SELECT bucket AS timestamp, count, total / count AS mean, min_value AS min, max_value AS max "
+            "FROM rollups WHERE subject_id = ? AND kind = ? AND resolution = ? AND bucket >= ? AND bucket < ? "
+            "ORDER BY bucket",
+            conn, params=(subject_id, kind, resolution, start.strftime(fmt), end.strftime(fmt)),
+        )
+    finally:
+        conn.close()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format=fmt)
+    return df
+
+
+def _latest(subject_id, kind, column, path):
+    if subject_id is None or not os.path.exists(path):
+        return None
+    conn = connect(path)
+    try:
+        row = conn.execute(
+            f"SELECT {column} FROM samples WHERE subject_id = ? AND kind = ? ORDER BY timestamp DESC LIMIT 1",
+            (subject_id, kind),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def latest_value(subject_id, kind, path=DEFAULT_DB_PATH):
+    """Return the most recent sample value for a subject's signal, or None."""
+    return _latest(subject_id, kind, "value", path)
+
+
+def latest_timestamp(subject_id, kind, path=DEFAULT_DB_PATH):
+    """Return the timestamp of a subject's most recent sample, or None."""
+    return _latest(subject_id, kind, "timestamp", path)
+
+
+def list_subjects(path=DEFAULT_DB_PATH):
+    """Return the subject ids that have samples in the store."""
+    if not os.path.exists(path):
+        return []
+    conn = connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT DISTINCT subject_id FROM samples ORDER BY subject_id")]
+    finally:
+        conn.close()
+
+
+def _load_signal(kind, subject_id, path, since=None):
+    if not os.path.exists(path):
+        return pd.DataFrame({"timestamp": pd.Series(dtype=str), "value": pd.Series(dtype=float)})
+    since = _as_datetime(since, datetime(1970, 1, 1))
+    # Whole seconds without a fraction also match samples stored without one
+    since = since.strftime("%Y-%m-%d %H:%M:%S.%f" if since.microsecond else "%Y-%m-%d %H:%M:%S")
+    conn = connect(path)
+    try:
+        return pd.read_sql_query(
+            "SELECT timestamp, value FROM samples WHERE subject_id = ? AND kind = ? AND timestamp >= ? "
+            "ORDER BY timestamp",
+            conn, params=(subject_id, kind, since),
+        )
+    finally:
+        conn.close()
+
+
+def load_bpm_df(subject_id=None, path=DEFAULT_DB_PATH, fallback_csv="heartBeat.csv", since=None):
+    """Return a ``timestamp, bpm`` frame for a subject.
+
+    The demo CSV is only used when no subject is selected; a subject with no
+    BPM samples gets an empty frame, never someone else's data. ``since``
+    (a datetime or ISO string) limits stored samples to the ones at or after
+    it.
+    """
+    if subject_id is None:
+        return pd.read_csv(fallback_csv)
+    return _load_signal("bpm", subject_id, path, since).rename(columns={"value": "bpm"})
+
+
+def load_volume_df(subject_id=None, path=DEFAULT_DB_PATH, fallback_csv="audio_volume.csv"):
+    """Return a ``time_step, volume`` frame for a subject.
+
+    As with ``load_bpm_df`` the demo CSV is only used without a subject, and
+    a subject with no volume samples gets an empty frame. Frames from the
+    store also keep each sample's ``timestamp``.
+    """
+    if subject_id is None:
+        return pd.read_csv(fallback_csv)
+    df = _load_signal("volume", subject_id, path).rename(columns={"value": "volume"})
+    df.insert(0, "time_step", range(1, len(df) + 1))
+    return df
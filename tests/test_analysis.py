@@ -0,0 +1,68 @@
+import numpy as np
+
+from analysis import classify_emotion, count_repetitions, has_high_bpm, radar_timeline
+
+T0 = np.datetime64("2025-05-26T10:00:00", "ns")
+
+
+def seconds(*offsets):
+    return T0 + np.array(offsets, dtype="timedelta64[s]")
+
+
+def test_radar_timeline_window_edges():
+    times = seconds(0, 10, 29, 30, 59, 60)
+    starts, values = radar_timeline(times, [60, 90, 75, 120, 60, 45], [0.2] * 6, -0.5, True,
+                                    window_seconds=30)
+    assert list(starts) == list(seconds(0, 30, 60))
+    np.testing.assert_allclose(values[:, 0], [90 / 150, 120 / 150, 45 / 150])
+    np.testing.assert_allclose(values[:, 2:], [[1, 0.5]] * 3)
+
+
+def test_radar_timeline_skips_empty_windows_with_correct_starts():
+    times = seconds(0, 10, 200, 210)
+    starts, values = radar_timeline(times, [80, 90, 100, 110], [0.1, 0.2, 0.3, 0.4], 0.1, False,
+                                    window_seconds=60)
+    assert list(starts) == list(seconds(0, 180))
+    np.testing.assert_allclose(values[:, 0], [90 / 150, 110 / 150])
+    np.testing.assert_allclose(values[:, 3], [0, 0])
+
+
+def test_radar_timeline_never_exceeds_max_windows():
+    times = T0 + np.arange(0, 3601, 10).astype("timedelta64[s]")
+    starts, values = radar_timeline(times, np.full(len(times), 80.0), [0.5], 0.0, False,
+                                    window_seconds=1, max_windows=60)
+    assert len(starts) == len(values) == 60
+    assert np.all(np.diff(starts) > np.timedelta64(0))
+
+
+def test_radar_timeline_buckets_volume_by_time():
+    # Two BPM bursts two hours apart; volume is recorded unevenly
+    bpm_times = seconds(0, 30, 7200, 7230)
+    volume_times = seconds(5, 7205, 7210, 7215)
+    starts, values = radar_timeline(bpm_times, [80] * 4, [0.9, 0.1, 0.2, 0.3], 0.0, False,
+                                    window_seconds=60, volume_times=volume_times)
+    assert list(starts) == list(seconds(0, 7200))
+    np.testing.assert_allclose(values[:, 1], [0.9, 0.2])
+
+
+def test_radar_timeline_scores_windows_without_volume_as_zero():
+    bpm_times = seconds(0, 60, 120)
+    starts, values = radar_timeline(bpm_times, [80] * 3, [0.5, 0.7], 0.0, False,
+                                    window_seconds=60, volume_times=seconds(125, 130))
+    np.testing.assert_allclose(values[:, 1], [0, 0, 0.6])
+
+
+def test_count_repetitions_and_classification():
+    assert count_repetitions("Please. Please. I want mom mom.") == 2
+    assert classify_emotion(True, True, True, -0.8)[0] == "Anxious"
+    assert classify_emotion(False, True, True, -0.8)[0] == "Sad"
+    assert classify_emotion(False, False, False, 0.5)[0] == "Happy"
+    assert classify_emotion(False, False, False, 0.0)[0] == "Neutral"
+
+
+def test_has_high_bpm_needs_an_absolute_high_level():
+    assert has_high_bpm(range(100), [140] * 100)
+    assert has_high_bpm(range(100), [70] * 50 + [130] + [70] * 49)
+    assert has_high_bpm(range(100), [70] * 30 + [115] * 70)
+    assert not has_high_bpm(range(100), [60] * 30 + [75] * 70)
+    assert not has_high_bpm(range(100), [70] * 100)
@@ -0,0 +1,73 @@
+import csv
+
+import pytest
+
+from batch_analyze import FIELDS, CsvSink, ParquetSink, analyze_session, run
+
+
+def make_session(root, name, transcript="I want mom. I want mom.", bpm_rows=None):
+    session = root / name
+    session.mkdir()
+    (session / "transcript.txt").write_text(transcript, encoding="utf-8")
+    if bpm_rows is not None:
+        (session / "heartBeat.csv").write_text("timestamp,bpm\n" + "".join(bpm_rows), encoding="utf-8")
+    return session
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_analyze_session_reports_errors_instead_of_raising(tmp_path):
+    session = make_session(tmp_path, "broken", bpm_rows=["not,a,valid,row\n"])
+    row = analyze_session(str(session))
+    assert row["session_id"] == "broken"
+    assert row["error"]
+
+
+def test_failed_sessions_are_retried_on_resume(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    make_session(archive, "ok")
+    broken = make_session(archive, "broken", bpm_rows=["not,a,valid,row\n"])
+    output = str(tmp_path / "results.csv")
+
+    assert run(str(archive), output, workers=1) == 2
+    (broken / "heartBeat.csv").write_text("timestamp,bpm\n2025-05-26 10:00:00,85\n", encoding="utf-8")
+    assert run(str(archive), output, workers=1) == 1
+
+    rows = read_rows(output)
+    assert [(r["session_id"], bool(r["error"])) for r in rows][-1] == ("broken", False)
+    assert CsvSink(output).done_sessions() == {"ok", "broken"}
+
+
+def test_partial_last_row_is_dropped_before_appending(tmp_path):
+    output = tmp_path / "results.csv"
+    header = ",".join(FIELDS) + "\n"
+    output.write_text(header + "a" + "," * (len(FIELDS) - 2) + "Neutral,\n" + "b,0.1,0.", encoding="utf-8")
+
+    sink = CsvSink(str(output))
+    assert sink.done_sessions() == {"a"}
+    with sink:
+        sink.write(dict.fromkeys(FIELDS, "") | {"session_id": "b", "emotion": "Sad"})
+
+    rows = read_rows(output)
+    assert [(r["session_id"], r["emotion"]) for r in rows] == [("a", "Neutral"), ("b", "Sad")]
+
+
+def test_parquet_parts_are_renamed_into_place(tmp_path):
+    pytest.importorskip("pyarrow")
+    output = tmp_path / "results.parquet"
+    output.mkdir()
+    (output / "part-1.parquet.tmp").write_bytes(b"PAR1 truncated")
+
+    sink = ParquetSink(str(output), rows_per_part=2, flush_interval=3600)
+    with sink:
+        sink.write(dict.fromkeys(FIELDS) | {"session_id": "a"})
+        sink.write(dict.fromkeys(FIELDS) | {"session_id": "b"})
+        assert len(list(output.glob("*.parquet"))) == 1
+        sink.write(dict.fromkeys(FIELDS) | {"session_id": "c"})
+
+    assert not list(output.glob("*.tmp"))
+    assert sink.done_sessions() == {"a", "b", "c"}
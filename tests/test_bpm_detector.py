@@ -0,0 +1,67 @@
+import csv
+import os
+
+from bpm_detector import BpmAnomalyDetector, detect_bpm_alerts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sustained_rise_reports_its_onset():
+    with open(os.path.join(ROOT, "heartBeat.csv"), newline="") as f:
+        rows = list(csv.DictReader(f))
+    alerts = detect_bpm_alerts([r["timestamp"] for r in rows], [int(r["bpm"]) for r in rows])
+    assert [(a.kind, a.onset, a.timestamp) for a in alerts] == [
+        ("rise", "2025-05-26 10:00:20", "2025-05-26 10:00:50"),
+    ]
+
+
+def test_sustained_drop_is_detected():
+    bpms = [80] * 10 + [70, 68, 66, 65, 65, 65]
+    alerts = detect_bpm_alerts(range(len(bpms)), bpms)
+    assert [a.kind for a in alerts] == ["drop"]
+    assert alerts[0].onset == 10
+
+
+def test_single_noisy_reading_is_a_spike_not_a_sustained_change():
+    bpms = [80, 81, 79, 80, 80, 140, 80, 81, 79, 80]
+    alerts = detect_bpm_alerts(range(len(bpms)), bpms)
+    assert [(a.kind, a.timestamp) for a in alerts] == [("spike", 5)]
+    assert alerts[0].score > 0
+
+
+def test_spike_does_not_drag_the_baseline():
+    detector = BpmAnomalyDetector()
+    detector.update_many("a", enumerate([80] * 20))
+    detector.update("a", 20, 200)
+    mean, _ = detector.baseline("a")
+    assert mean < 81
+
+
+def test_no_alerts_during_warmup():
+    bpms = [80, 200, 80, 80, 80]
+    assert detect_bpm_alerts(range(len(bpms)), bpms, warmup=3) == []
+    assert [a.kind for a in detect_bpm_alerts(range(len(bpms)), bpms, warmup=1)] == ["spike"]
+
+
+def test_alert_fires_once_per_episode():
+    bpms = [80] * 10 + [110] * 20
+    alerts = detect_bpm_alerts(range(len(bpms)), bpms)
+    assert [a.kind for a in alerts].count("rise") == 1
+
+
+def test_subjects_are_independent():
+    detector = BpmAnomalyDetector()
+    detector.update_many("calm", enumerate([70] * 10))
+    detector.update_many("busy", enumerate([120] * 10))
+    assert detector.baseline("calm")[0] == 70
+    assert detector.baseline("busy")[0] == 120
+    detector.reset("calm")
+    assert detector.baseline("calm") is None
+    assert detector.baseline("busy") is not None
+
+
+def test_update_always_returns_a_tuple():
+    detector = BpmAnomalyDetector(warmup=1)
+    results = [detector.update("a", t, bpm) for t, bpm in enumerate([80] * 10 + [200] + [80] * 5)]
+    assert all(type(found) is tuple for found in results)
+    assert [a.kind for found in results for a in found] == ["spike"]
@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+
+from ingest_server import BatchWriter, parse_samples
+
+
+def test_parse_samples_normalizes_timestamps():
+    data = b"a,bpm,2025-05-26 10:00:00,85\na,bpm,2025-05-26 10:00:00.5,86\nb,volume,0,0.5\nb,volume,0.25,0.6\n"
+    samples, rejected = parse_samples(data)
+    assert rejected == 0
+    assert samples == [
+        ("a", "bpm", "2025-05-26 10:00:00.000000", 85.0),
+        ("a", "bpm", "2025-05-26 10:00:00.500000", 86.0),
+        ("b", "volume", "1970-01-01 00:00:00.000000", 0.5),
+        ("b", "volume", "1970-01-01 00:00:00.250000", 0.6),
+    ]
+    # Epoch seconds and ISO strings land on the same (UTC) clock
+    assert parse_samples(b"a,bpm,1748253600,85\n")[0] == parse_samples(b"a,bpm,2025-05-26 10:00:00,85\n")[0]
+
+
+def test_parse_samples_rejects_bad_lines_but_keeps_the_rest():
+    data = b"\n".join([
+        b"a,bpm,2025-05-26 10:00:00,nan",
+        b"a,bpm,2025-05-26 10:00:01,inf",
+        b"a,bpm,2025-05-26 10:00:02,-inf",
+        b"a,bpm,1e20,80",
+        b"a,bpm,inf,80",
+        b"a,bpm,2025-05-26T10:00:03,80",
+        b"a,bpm,2025-05-26 10:00:03.,80",
+        b"a,bpm,-1e11,80",
+        b"a,bpm,2025-xx,80",
+        b"a,temperature,2025-05-26 10:00:04,36.6",
+        b"a,bpm,2025-05-26 10:00:05",
+        b"a,bpm,2025-05-26 10:00:06,90",
+    ])
+    samples, rejected = parse_samples(data)
+    assert rejected == 11
+    assert samples == [("a", "bpm", "2025-05-26 10:00:06.000000", 90.0)]
+
+
+def test_batch_writer_survives_a_failed_flush(tmp_path):
+    db_path = str(tmp_path / "signals.db")
+
+    async def scenario():
+        writer = BatchWriter(db_path, flush_interval=0.01)
+        flusher = asyncio.create_task(writer.run())
+        write = writer._write
+        calls = []
+
+        def failing_once(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise sqlite3.IntegrityError("boom")
+            return write(batch)
+
+        writer._write = failing_once
+        await writer.put([("a", "bpm", "2025-05-26 10:00:00", 85.0)])
+        while writer.stats["dropped"] == 0:
+            await asyncio.sleep(0.01)
+        await writer.put([("a", "bpm", "2025-05-26 10:00:10", 86.0)])
+        while writer.stats["written"] == 0:
+            assert not flusher.done()
+            await asyncio.sleep(0.01)
+        flusher.cancel()
+        await writer.close()
+        return writer.stats
+
+    stats = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert stats["dropped"] == 1
+    assert stats["written"] == 1
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT timestamp, value FROM samples").fetchall() == [("2025-05-26 10:00:10", 86.0)]
+
+
+def test_batch_writer_counts_samples_already_stored_as_duplicates(tmp_path):
+    db_path = str(tmp_path / "signals.db")
+
+    async def scenario():
+        writer = BatchWriter(db_path)
+        await writer.put([("a", "bpm", "2025-05-26 10:00:00.000000", 85.0)])
+        await writer._flush()
+        await writer.put([("a", "bpm", "2025-05-26 10:00:00.000000", 85.0),
+                          ("a", "bpm", "2025-05-26 10:00:00.500000", 86.0)])
+        await writer.close()
+        return writer.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["accepted"] == 3
+    assert stats["written"] == 2
+    assert stats["duplicates"] == 1
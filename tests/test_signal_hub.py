@@ -0,0 +1,108 @@
+import time
+
+import pandas as pd
+
+import signal_hub
+from bpm_detector import detect_bpm_alerts
+from signal_hub import BpmMonitor, SignalHub, downsample
+from signal_store import connect, load_bpm_df, load_volume_df, write_samples
+
+
+def counting_hub(**kwargs):
+    calls = []
+
+    def compute(subject_id):
+        calls.append(subject_id)
+        return {"subject_id": subject_id, "n": len(calls)}
+
+    return SignalHub(compute, **kwargs), calls
+
+
+def test_one_computation_per_subject_per_tick():
+    hub, calls = counting_hub()
+    subscriptions = [hub.subscribe("a") for _ in range(5)] + [hub.subscribe("b")]
+    hub.publish_once()
+    assert sorted(calls) == ["a", "b"]
+    assert {sub.latest()["subject_id"] for sub in subscriptions[:5]} == {"a"}
+    assert subscriptions[5].latest()["subject_id"] == "b"
+
+
+def test_slow_subscriber_drops_stale_frames():
+    hub, _ = counting_hub(queue_size=2)
+    subscription = hub.subscribe("a")
+    for _ in range(5):
+        hub.publish_once()
+    assert subscription.latest()["n"] == 5
+    assert subscription.dropped == 4
+    assert subscription.latest() is None
+
+
+def test_new_subscriber_gets_last_frame_immediately():
+    hub, calls = counting_hub()
+    hub.subscribe("a")
+    hub.publish_once()
+    late = hub.subscribe("a")
+    assert late.latest()["n"] == 1
+    assert len(calls) == 1
+
+
+def test_idle_subscription_expires_and_is_marked_inactive():
+    hub, calls = counting_hub(idle_timeout=0.01)
+    subscription = hub.subscribe("a")
+    time.sleep(0.02)
+    hub.publish_once()
+    assert not subscription.active
+    assert hub.subscriber_count() == 0
+    assert calls == []
+
+
+def test_unwatched_subjects_are_not_computed():
+    hub, calls = counting_hub()
+    subscription = hub.subscribe("a")
+    subscription.close()
+    hub.publish_once()
+    assert calls == []
+    assert not subscription.active
+
+
+def test_compute_errors_become_error_frames():
+    def compute(subject_id):
+        raise RuntimeError("store unavailable")
+
+    hub = SignalHub(compute)
+    subscription = hub.subscribe("a")
+    hub.publish_once()
+    assert subscription.latest()["error"] == "store unavailable"
+
+
+def test_downsample_keeps_peaks():
+    df = pd.DataFrame({"timestamp": range(1000), "bpm": [80] * 1000})
+    df.loc[517, "bpm"] = 150
+    small = downsample(df, "bpm", max_points=100, how="max")
+    assert len(small) <= 100
+    assert small["bpm"].max() == 150
+
+
+def test_build_frame_leaves_missing_signals_empty(tmp_path, monkeypatch):
+    path = str(tmp_path / "signals.db")
+    write_samples(connect(path), [("a", "volume", "2025-05-26 10:00:00", 0.9)])
+    monkeypatch.setattr(signal_hub, "load_bpm_df", lambda s: load_bpm_df(s, path=path))
+    monkeypatch.setattr(signal_hub, "load_volume_df", lambda s: load_volume_df(s, path=path))
+    frame = signal_hub.build_frame("a", "hello")
+    assert frame["max_bpm"] is None and not frame["high_bpm"]
+    assert frame["avg_volume"] == 0.9 and len(frame["radar_starts"]) == 0
+
+
+def test_bpm_monitor_scores_only_new_samples():
+    timestamps = [f"2025-05-26 10:{i // 60:02d}:{i % 60:02d}" for i in range(120)]
+    bpms = [70] * 60 + [130] * 60
+    monitor = BpmMonitor()
+    monitor.update("a", timestamps[:70], bpms[:70])
+    alerts, high_bpm = monitor.update("a", timestamps, bpms)
+    assert alerts == detect_bpm_alerts(timestamps, bpms, subject_id="a")
+    assert high_bpm
+    assert monitor.detector._subjects["a"].count == 120
+    # A history that goes back in time (e.g. a rebuilt store) is scored from scratch
+    alerts, high_bpm = monitor.update("a", timestamps[:50], bpms[:50])
+    assert alerts == [] and not high_bpm
+    assert monitor.detector._subjects["a"].count == 50
@@ -0,0 +1,123 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import signal_store
+from signal_store import (_cover, connect, latest_timestamp, load_bpm_df, load_volume_df, query_rollup,
+                          rebuild_rollups, rollup_series, summary_histogram, write_samples)
+
+T0 = datetime(2025, 5, 26, 9, 0, 0)
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    # Built once: none of the tests below change the rollup totals
+    path = str(tmp_path_factory.mktemp("store") / "signals.db")
+    rng = random.Random(0)
+    rows = [
+        ("a", "bpm", (T0 + timedelta(seconds=10 * i)).strftime("%Y-%m-%d %H:%M:%S"), rng.randint(55, 125))
+        for i in range(3 * 24 * 360)
+    ]
+    conn = connect(path)
+    for i in range(0, len(rows), 5000):
+        write_samples(conn, rows[i:i + 5000])
+    write_samples(conn, [("b", "bpm", "2025-05-26 09:00:00", 70.0)])
+    yield path, conn, rows
+    conn.close()
+
+
+def raw_scan(rows, start=None, end=None):
+    values = [r[3] for r in rows if (start is None or r[2] >= start) and (end is None or r[2] < end)]
+    return len(values), sum(values), min(values), max(values)
+
+
+@pytest.mark.parametrize("start,end", [
+    (None, None),
+    ("2025-05-26 09:17:00", "2025-05-28 13:42:00"),
+    ("2025-05-26 10:03:00", "2025-05-26 10:07:00"),
+    ("2025-05-27 00:00:00", "2025-05-28 00:00:00"),
+    ("2025-05-26 23:59:00", "2025-05-27 00:01:00"),
+    (None, "2025-05-27 05:30:00"),
+    ("2025-05-28 20:00:00", None),
+])
+def test_rollup_matches_raw_scan(store, start, end):
+    path, _, rows = store
+    summary = query_rollup("a", "bpm", start, end, path=path)
+    assert (summary.count, summary.total, summary.min, summary.max) == raw_scan(rows, start, end)
+    assert sum(summary.hist) == summary.count
+
+
+def test_rollup_is_none_outside_history(store):
+    path, _, _ = store
+    assert query_rollup("a", "bpm", "2030-01-01 00:00:00", "2030-01-02 00:00:00", path=path) is None
+    assert query_rollup("missing", "bpm", path=path) is None
+    assert query_rollup("a", "bpm", path=path + ".absent") is None
+
+
+def test_rollup_series_matches_raw_scan_per_hour(store):
+    path, _, rows = store
+    series = rollup_series("a", "bpm", "hour", "2025-05-27 10:30:00", "2025-05-27 13:30:00", path=path)
+    assert [t.hour for t in series["timestamp"]] == [10, 11, 12]
+    for t, count, mean, low, high in zip(*(series[c] for c in ["timestamp", "count", "mean", "min", "max"])):
+        start, end = t.strftime("%Y-%m-%d %H"), (t + timedelta(hours=1)).strftime("%Y-%m-%d %H")
+        assert (count, count * mean, low, high) == pytest.approx(raw_scan(rows, start, end))
+
+
+def test_recent_samples_are_loaded_from_the_latest_timestamp(store):
+    path, _, rows = store
+    assert latest_timestamp("a", "bpm", path=path) == rows[-1][2]
+    recent = load_bpm_df("a", path=path, since="2025-05-29 08:00:00")
+    assert list(recent["timestamp"]) == [r[2] for r in rows if r[2] >= "2025-05-29 08:00:00"]
+
+
+def test_resent_samples_are_not_counted_twice(store):
+    path, conn, rows = store
+    write_samples(conn, [(s, k, t, v + 1) for s, k, t, v in rows[:100]])
+    summary = query_rollup("a", "bpm", path=path)
+    assert (summary.count, summary.total) == raw_scan(rows)[:2]
+
+
+def test_rebuild_rollups_matches_incremental(store):
+    path, conn, _ = store
+    before = query_rollup("a", "bpm", "2025-05-26 09:17:00", "2025-05-28 13:42:00", path=path)
+    rebuild_rollups(conn)
+    assert query_rollup("a", "bpm", "2025-05-26 09:17:00", "2025-05-28 13:42:00", path=path) == before
+
+
+def test_cover_uses_coarsest_buckets_and_tiles_the_range():
+    start, end = datetime(2025, 5, 26, 9, 17), datetime(2025, 5, 28, 13, 42)
+    ranges = _cover(start, end)
+    assert [r[0] for r in ranges] == ["minute", "hour", "day", "hour", "minute"]
+    assert ranges[0][1] == start and ranges[-1][2] == end
+    assert all(a[2] == b[1] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_cover_of_aligned_or_empty_ranges():
+    day = datetime(2025, 5, 27)
+    assert _cover(day, day + timedelta(days=1)) == [("day", day, day + timedelta(days=1))]
+    assert _cover(day, day) == []
+
+
+def test_values_outside_histogram_range_land_in_edge_bins(tmp_path):
+    path = str(tmp_path / "signals.db")
+    conn = connect(path)
+    write_samples(conn, [("a", "bpm", "2025-05-26 10:00:00", 10.0), ("a", "bpm", "2025-05-26 10:00:10", 400.0)])
+    summary = query_rollup("a", "bpm", path=path)
+    assert summary.hist[0] == 1 and summary.hist[-1] == 1
+    centers, counts, _ = summary_histogram(summary, "bpm", bins=20)
+    assert sum(counts) == 2 and len(centers) <= 20
+
+
+def test_loaders_fall_back_to_csv_and_keep_volume_timestamps(tmp_path, monkeypatch):
+    monkeypatch.chdir(signal_store.os.path.dirname(signal_store.__file__))
+    path = str(tmp_path / "signals.db")
+    assert list(load_bpm_df(None, path=path).columns) == ["timestamp", "bpm"]
+    conn = connect(path)
+    write_samples(conn, [("a", "volume", "2025-05-26 10:00:00", 0.5)])
+    volume_df = load_volume_df("a", path=path)
+    assert list(volume_df.columns) == ["time_step", "timestamp", "volume"]
+    # A known subject never gets the demo CSV, even for a kind it hasn't streamed
+    bpm_df = load_bpm_df("a", path=path)
+    assert list(bpm_df.columns) == ["timestamp", "bpm"] and len(bpm_df) == 0
+    assert len(load_volume_df("missing", path=str(tmp_path / "none.db"))) == 0